@@ -1,11 +1,15 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from pathlib import Path
 import unicodedata
 import io
+import os
+import tempfile
 
 # =========================
 # Streamlit 설정
@@ -41,12 +45,70 @@ DATA_DIR = BASE_DIR / "data"
 def normalize_name(name: str) -> str:
     return unicodedata.normalize("NFC", name)
 
+@st.cache_resource
+def _data_index() -> dict[str, Path]:
+    return {normalize_name(p.name): p for p in DATA_DIR.iterdir()}
+
 def find_file(filename: str) -> Path | None:
-    target = normalize_name(filename)
-    for p in DATA_DIR.iterdir():
-        if normalize_name(p.name) == target:
-            return p
-    return None
+    return _data_index().get(normalize_name(filename))
+
+# =========================
+# Parquet 캐시
+# =========================
+# 파싱 결과 스키마가 바뀌면 올려서 기존 캐시를 무효화
+PARQUET_CACHE_VERSION = 4
+
+def _source_signature(path: Path) -> list[int]:
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+@st.cache_resource
+def _process_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+def _remove_outdated_snapshots(path: Path, cache_path: Path):
+    # 버전 없는 `<이름>.parquet`(초기 캐시)와 이전 버전 스냅샷은 스키마가 달라 재사용 불가
+    outdated = [path.with_name(f"{path.name}.parquet")]
+    outdated += path.parent.glob(f"{path.name}.v*.parquet")
+    for p in outdated:
+        if p != cache_path and p.exists():
+            p.unlink()
+
+def read_with_parquet_cache(path: Path, reader) -> pd.DataFrame:
+    cache_path = path.with_name(f"{path.name}.v{PARQUET_CACHE_VERSION}.parquet")
+    signature = _source_signature(path)
+
+    if cache_path.exists():
+        try:
+            df = pd.read_parquet(cache_path, engine="pyarrow")
+        except (OSError, pa.ArrowException):
+            df = None  # 손상된 스냅샷은 원본에서 다시 생성
+        if df is not None and df.attrs.pop("source", None) == signature:
+            return df
+
+    df = reader(path)
+    df.attrs["source"] = signature
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=cache_path.parent, prefix=f".{cache_path.name}.", suffix=".tmp"
+        )
+        os.close(fd)
+        df.to_parquet(tmp_path, engine="pyarrow", compression="zstd")
+        # mkstemp는 0600으로 만들므로 다른 사용자도 읽을 수 있게 umask 기본 권한 적용
+        os.chmod(tmp_path, 0o666 & ~_process_umask())
+        os.replace(tmp_path, cache_path)
+        tmp_path = None
+        _remove_outdated_snapshots(path, cache_path)
+    except (OSError, pa.ArrowException):
+        pass  # 스냅샷은 최적화일 뿐이므로 쓰기 실패 시 캐시 없이 진행
+    finally:
+        df.attrs.pop("source", None)
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return df
 
 # =========================
 # 데이터 로딩
@@ -60,14 +122,24 @@ def load_env_data():
         "동산고": "동산고_환경데이터.csv",
     }
 
+    def read_env_csv(csv_path: Path) -> pd.DataFrame:
+        df = pd.read_csv(
+            csv_path, usecols=["time", "temperature", "humidity", "ph", "ec"]
+        )
+        for c in ("temperature", "humidity", "ph", "ec"):
+            df[c] = df[c].astype("float32")
+        df["time"] = pd.to_datetime(df["time"], errors="coerce", format="mixed")
+        return df.sort_values("time").reset_index(drop=True)
+
+    school_dtype = pd.CategoricalDtype(list(mapping.keys()))
     result = {}
     for school, fname in mapping.items():
         path = find_file(fname)
         if path is None:
             st.error(f"❌ 환경 데이터 파일 없음: {fname}")
             continue
-        df = pd.read_csv(path)
-        df["school"] = school
+        df = read_with_parquet_cache(path, read_env_csv)
+        df["school"] = pd.Series(school, index=df.index, dtype=school_dtype)
         result[school] = df
     return result
 
@@ -78,13 +150,156 @@ def load_growth_data():
         st.error("❌ 생육결과 XLSX 파일 없음")
         return {}
 
-    xls = pd.ExcelFile(path)
-    result = {}
-    for sheet in xls.sheet_names:
-        df = pd.read_excel(path, sheet_name=sheet)
-        df["school"] = sheet
-        result[sheet] = df
-    return result
+    def read_workbook(xlsx_path: Path) -> pd.DataFrame:
+        dtypes = {
+            "생중량(g)": "float32",
+            "지상부 길이(mm)": "float32",
+        }
+        sheets = pd.read_excel(
+            xlsx_path, sheet_name=None, engine="calamine", dtype=dtypes
+        )
+        columns = ("개체번호", "잎 수(장)", "지상부 길이(mm)", "지하부길이(mm)", "생중량(g)")
+        for name, df in sheets.items():
+            df = df[[c for c in columns if c in df.columns]].copy()
+            # 빈 칸이 있으면 int16으로 담을 수 없으므로 float32로 유지
+            leaves = df["잎 수(장)"]
+            df["잎 수(장)"] = leaves.astype("int16" if leaves.notna().all() else "float32")
+            df["school"] = name
+            sheets[name] = df
+        growth = pd.concat(sheets.values(), ignore_index=True)
+        growth["school"] = growth["school"].astype(pd.CategoricalDtype(list(sheets)))
+        return growth
+
+    growth = read_with_parquet_cache(path, read_workbook)
+    return {
+        school: df.reset_index(drop=True)
+        for school, df in growth.groupby("school", observed=True, sort=False)
+    }
+
+# 프레임을 인자로 받으면 매 rerun마다 해싱 비용이 concat보다 커지므로
+# 캐시된 로더를 내부에서 호출
+@st.cache_data
+def build_all_env():
+    return pd.concat(load_env_data().values(), ignore_index=True)
+
+@st.cache_data
+def build_growth_all(ec_info):
+    growth_all = pd.concat(load_growth_data().values(), ignore_index=True)
+    growth_all["EC"] = growth_all["school"].map(ec_info).astype(float)
+    return growth_all
+
+@st.cache_data
+def build_info_df(ec_info, counts: tuple):
+    return pd.DataFrame({
+        "학교명": list(ec_info.keys()),
+        "EC 목표": list(ec_info.values()),
+        "개체수": list(counts)
+    })
+
+@st.cache_data
+def overview_metrics():
+    all_env = build_all_env()
+    return dict(
+        n=sum(len(df) for df in load_growth_data().values()),
+        t=float(all_env["temperature"].mean()),
+        h=float(all_env["humidity"].mean()),
+    )
+
+@st.cache_data
+def growth_ec_summary(growth_all):
+    return growth_all.groupby("EC").agg(
+        weight=("생중량(g)", "mean"),
+        leaves=("잎 수(장)", "mean"),
+        shoot=("지상부 길이(mm)", "mean"),
+        n=("생중량(g)", "size"),
+    ).reset_index()
+
+@st.cache_data
+def csv_bytes(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode("utf-8-sig")
+
+@st.cache_data
+def growth_xlsx_bytes(growth_all):
+    buffer = io.BytesIO()
+    growth_all.to_excel(buffer, index=False, engine="openpyxl")
+    return buffer.getvalue()
+
+# =========================
+# 시계열 다운샘플링 (LTTB)
+# =========================
+LTTB_THRESHOLD = 2000
+
+@st.cache_data
+def lttb_downsample(df: pd.DataFrame, col: str, threshold: int = LTTB_THRESHOLD) -> pd.DataFrame:
+    df = df[df["time"].notna()]
+    n = len(df)
+    if n <= threshold:
+        return df
+
+    # 그려지는 시간축(초 단위)에서 삼각형 면적을 계산 (로딩 시 시간순으로 정렬됨)
+    x = df["time"].to_numpy("datetime64[ns]").astype(np.int64) / 1e9
+    y = df[col].to_numpy(dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(max(int((i + 2) * every) + 1, end + 1), n)
+
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+
+    return df.iloc[selected]
+
+# =========================
+# Plotly 헬퍼
+# =========================
+def add_subplot_traces(fig, traces):
+    fig.add_traces(
+        [trace for trace, _, _ in traces],
+        rows=[row for _, row, _ in traces],
+        cols=[col for _, _, col in traces],
+    )
+
+def session_bar_subplots(key, subplot_titles, cells):
+    # 레이아웃/트레이스 골격은 세션당 한 번만 만들고 이후에는 데이터만 교체
+    fig = st.session_state.get(key)
+    if fig is None:
+        fig = make_subplots(rows=2, cols=2, subplot_titles=subplot_titles)
+        add_subplot_traces(fig, [(go.Bar(name=name), row, col) for row, col, name in cells])
+        fig.update_layout(height=600, font=PLOTLY_FONT)
+        st.session_state[key] = fig
+    return fig
+
+def set_bar_data(fig, data):
+    with fig.batch_update():
+        for trace, (x, y) in zip(fig.data, data):
+            trace.x, trace.y = x, y
+
+# =========================
+# 표 페이지 표시
+# =========================
+PAGE_SIZE = 500
+
+def show_paginated(df: pd.DataFrame, key: str, page_size: int = PAGE_SIZE):
+    n_pages = max(1, -(-len(df) // page_size))
+    page = 1
+    if n_pages > 1:
+        page = st.number_input(
+            f"페이지 (1-{n_pages})",
+            min_value=1, max_value=n_pages, value=1, step=1, key=key
+        )
+    start = (page - 1) * page_size
+    st.dataframe(df.iloc[start:start + page_size], use_container_width=True)
 
 # =========================
 # 데이터 로딩 실행
@@ -106,6 +321,9 @@ EC_INFO = {
     "동산고": 8.0,
 }
 
+all_env = build_all_env()
+growth_all = build_growth_all(EC_INFO)
+
 # =========================
 # Sidebar
 # =========================
@@ -134,22 +352,19 @@ with tab1:
         """
     )
 
-    info_df = pd.DataFrame({
-        "학교명": list(EC_INFO.keys()),
-        "EC 목표": list(EC_INFO.values()),
-        "개체수": [len(growth_data[k]) for k in EC_INFO.keys()]
-    })
+    info_df = build_info_df(
+        EC_INFO, tuple(len(growth_data[k]) for k in EC_INFO.keys())
+    )
 
     st.subheader("🏫 학교별 EC 조건")
     st.dataframe(info_df, use_container_width=True)
 
-    all_env = pd.concat(env_data.values(), ignore_index=True)
-    total_plants = sum(len(df) for df in growth_data.values())
+    metrics = overview_metrics()
 
     c1, c2, c3, c4 = st.columns(4)
-    c1.metric("총 개체수", total_plants)
-    c2.metric("평균 온도", f"{all_env['temperature'].mean():.1f} °C")
-    c3.metric("평균 습도", f"{all_env['humidity'].mean():.1f} %")
+    c1.metric("총 개체수", metrics["n"])
+    c2.metric("평균 온도", f"{metrics['t']:.1f} °C")
+    c3.metric("평균 습도", f"{metrics['h']:.1f} %")
     c4.metric("최적 EC", "2.0 (하늘고) ⭐")
 
 # =====================================================
@@ -158,28 +373,26 @@ with tab1:
 with tab2:
     st.subheader("📊 학교별 환경 평균 비교")
 
-    avg_df = all_env.groupby("school").mean(numeric_only=True).reset_index()
-
-    fig = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=("평균 온도", "평균 습도", "평균 pH", "목표 EC vs 실측 EC")
-    )
-
-    fig.add_trace(go.Bar(x=avg_df["school"], y=avg_df["temperature"]), 1, 1)
-    fig.add_trace(go.Bar(x=avg_df["school"], y=avg_df["humidity"]), 1, 2)
-    fig.add_trace(go.Bar(x=avg_df["school"], y=avg_df["ph"]), 2, 1)
-
-    fig.add_trace(
-        go.Bar(x=list(EC_INFO.keys()), y=list(EC_INFO.values()), name="목표 EC"),
-        2, 2
-    )
-    fig.add_trace(
-        go.Bar(x=avg_df["school"], y=avg_df["ec"], name="실측 EC"),
-        2, 2
+    avg_df = all_env.groupby("school", observed=True, sort=False).agg(
+        temperature=("temperature", "mean"),
+        humidity=("humidity", "mean"),
+        ph=("ph", "mean"),
+        ec=("ec", "mean"),
+    ).reset_index()
+
+    fig = session_bar_subplots(
+        "env_fig",
+        ("평균 온도", "평균 습도", "평균 pH", "목표 EC vs 실측 EC"),
+        [(1, 1, None), (1, 2, None), (2, 1, None), (2, 2, "목표 EC"), (2, 2, "실측 EC")]
     )
-
-    fig.update_layout(height=600, font=PLOTLY_FONT)
-    st.plotly_chart(fig, use_container_width=True)
+    set_bar_data(fig, [
+        (avg_df["school"], avg_df["temperature"]),
+        (avg_df["school"], avg_df["humidity"]),
+        (avg_df["school"], avg_df["ph"]),
+        (list(EC_INFO.keys()), list(EC_INFO.values())),
+        (avg_df["school"], avg_df["ec"]),
+    ])
+    st.plotly_chart(fig, use_container_width=True, key="env-fig")
 
     if school_option != "전체":
         st.subheader("⏱️ 시계열 데이터")
@@ -189,18 +402,20 @@ with tab2:
             ["temperature", "humidity", "ec"],
             ["온도 변화", "습도 변화", "EC 변화"]
         ):
-            fig_line = px.line(df, x="time", y=col, title=title)
+            fig_line = px.line(
+                lttb_downsample(df, col),
+                x="time", y=col, title=title, render_mode="webgl"
+            )
             if col == "ec":
                 fig_line.add_hline(y=EC_INFO[school_option], line_dash="dash")
             fig_line.update_layout(font=PLOTLY_FONT)
             st.plotly_chart(fig_line, use_container_width=True)
 
         with st.expander("📄 환경 데이터 원본"):
-            st.dataframe(df)
-            csv = df.to_csv(index=False).encode("utf-8-sig")
+            show_paginated(df, key="env-page")
             st.download_button(
                 "CSV 다운로드",
-                data=csv,
+                data=csv_bytes(df),
                 file_name=f"{school_option}_환경데이터.csv",
                 mime="text/csv"
             )
@@ -211,65 +426,39 @@ with tab2:
 with tab3:
     st.subheader("🥇 EC별 평균 생중량")
 
-    # ✅ 오류 수정된 핵심 부분
-    growth_all = pd.concat(growth_data.values(), ignore_index=True)
-    growth_all["EC"] = growth_all["school"].map(EC_INFO)
+    ec_summary = growth_ec_summary(growth_all)
+    ec_labels = ec_summary["EC"].astype(str)
+    best_ec = ec_summary.loc[ec_summary["weight"].idxmax(), "EC"]
 
-    avg_weight = growth_all.groupby("EC")["생중량(g)"].mean().reset_index()
-    best_ec = avg_weight.loc[avg_weight["생중량(g)"].idxmax(), "EC"]
-
-    cols = st.columns(len(avg_weight))
-    for i, row in avg_weight.iterrows():
+    cols = st.columns(len(ec_summary))
+    for i, row in ec_summary.iterrows():
         label = "⭐ 최적" if row["EC"] == best_ec else ""
         cols[i].metric(
             f"EC {row['EC']}",
-            f"{row['생중량(g)']:.2f} g",
+            f"{row['weight']:.2f} g",
             label
         )
 
-    fig2 = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=("평균 생중량", "평균 잎 수", "평균 지상부 길이", "개체수")
-    )
-
-    fig2.add_trace(
-        go.Bar(x=avg_weight["EC"].astype(str), y=avg_weight["생중량(g)"]),
-        1, 1
-    )
-
-    fig2.add_trace(
-        go.Bar(
-            x=growth_all.groupby("EC")["잎 수(장)"].mean().index.astype(str),
-            y=growth_all.groupby("EC")["잎 수(장)"].mean().values
-        ),
-        1, 2
-    )
-
-    fig2.add_trace(
-        go.Bar(
-            x=growth_all.groupby("EC")["지상부 길이(mm)"].mean().index.astype(str),
-            y=growth_all.groupby("EC")["지상부 길이(mm)"].mean().values
-        ),
-        2, 1
-    )
-
-    fig2.add_trace(
-        go.Bar(
-            x=growth_all.groupby("EC").size().index.astype(str),
-            y=growth_all.groupby("EC").size().values
-        ),
-        2, 2
+    fig2 = session_bar_subplots(
+        "growth_fig",
+        ("평균 생중량", "평균 잎 수", "평균 지상부 길이", "개체수"),
+        [(1, 1, None), (1, 2, None), (2, 1, None), (2, 2, None)]
     )
-
-    fig2.update_layout(height=600, font=PLOTLY_FONT)
-    st.plotly_chart(fig2, use_container_width=True)
+    set_bar_data(fig2, [
+        (ec_labels, ec_summary["weight"]),
+        (ec_labels, ec_summary["leaves"]),
+        (ec_labels, ec_summary["shoot"]),
+        (ec_labels, ec_summary["n"]),
+    ])
+    st.plotly_chart(fig2, use_container_width=True, key="growth-fig")
 
     st.subheader("📦 학교별 생중량 분포")
     fig_box = px.box(
         growth_all,
         x="school",
         y="생중량(g)",
-        color="school"
+        color="school",
+        points="outliers"
     )
     fig_box.update_layout(font=PLOTLY_FONT)
     st.plotly_chart(fig_box, use_container_width=True)
@@ -282,7 +471,8 @@ with tab3:
             growth_all,
             x="잎 수(장)",
             y="생중량(g)",
-            color="school"
+            color="school",
+            render_mode="webgl"
         )
         fig_sc1.update_layout(font=PLOTLY_FONT)
         st.plotly_chart(fig_sc1, use_container_width=True)
@@ -292,20 +482,19 @@ with tab3:
             growth_all,
             x="지상부 길이(mm)",
             y="생중량(g)",
-            color="school"
+            color="school",
+            render_mode="webgl"
         )
         fig_sc2.update_layout(font=PLOTLY_FONT)
         st.plotly_chart(fig_sc2, use_container_width=True)
 
     with st.expander("📄 생육 데이터 원본 다운로드"):
-        buffer = io.BytesIO()
-        growth_all.to_excel(buffer, index=False, engine="openpyxl")
-        buffer.seek(0)
-
-        st.dataframe(growth_all)
-        st.download_button(
-            "XLSX 다운로드",
-            data=buffer,
-            file_name="생육결과_통합.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        show_paginated(growth_all, key="growth-page")
+
+        if st.checkbox("XLSX 파일 준비", key="dl_open"):
+            st.download_button(
+                "XLSX 다운로드",
+                data=growth_xlsx_bytes(growth_all),
+                file_name="생육결과_통합.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )